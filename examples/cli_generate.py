@@ -1,9 +1,15 @@
 import argparse
+import hashlib
 import json
 import logging
 import os
+import pickle
 import random
-from typing import Dict, List, Tuple
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, FrozenSet, List, Optional, Tuple
 
 from llama_index.core.schema import NodeRelationship
 
@@ -20,10 +26,13 @@ logger = logging.getLogger(__name__)
 
 def process_document(
     file_path, chunk_size=1000, chunk_overlap=200
-) -> Tuple[List[Dict], List[str]]:
-    """Process uploaded document and return chunks with metadata."""
+) -> Tuple[List[Dict], List[str], Dict[str, List[str]]]:
+    """
+    Process uploaded document and return chunks with metadata, the underlying
+    nodes and a map from each original node_id to its children node_ids.
+    """
     if file_path is None:
-        return [], []
+        return [], [], {}
 
     # Chunk the document and organize by relationships
     chunked_doc = chunk_document(
@@ -33,6 +42,7 @@ def process_document(
 
     all_nodes: List[str] = []
     chunk_data: List[Dict] = []
+    node_id_to_children_map: Dict[str, List[str]] = {}
     ui_id_counter = 0
 
     for _, nodes_in_group in organized_chunks.items():
@@ -44,26 +54,35 @@ def process_document(
 
             parent_relation = node.relationships.get(NodeRelationship.PARENT, {})
             parent_id = (
-                parent_relation.node_id if hasattr(parent_relation, "node_id") else None
+                sys.intern(parent_relation.node_id)
+                if hasattr(parent_relation, "node_id")
+                else None
             )
 
             children_relation = node.relationships.get(NodeRelationship.CHILD, [])
             children_ids = []
             if isinstance(children_relation, list):
                 children_ids = [
-                    child.node_id
+                    sys.intern(child.node_id)
                     for child in children_relation
                     if hasattr(child, "node_id")
                 ]
             elif hasattr(children_relation, "node_id"):
-                children_ids = [children_relation.node_id]
+                children_ids = [sys.intern(children_relation.node_id)]
+
+            # Intern node ids so every map and set below shares one string object
+            # per id, making hashing and equality checks identity-fast
+            node_id = sys.intern(node.node_id)
+
+            # Splits of the same original node share its children_ids
+            node_id_to_children_map.setdefault(node_id, children_ids)
 
             context_path = node.metadata.get("context", "")
 
             chunk_data.append(
                 {
                     "id": ui_id_counter,
-                    "node_id": node.node_id,
+                    "node_id": node_id,
                     "text": node.text,
                     "header_level": header_level,
                     "header_tag": header_tag,
@@ -76,7 +95,56 @@ def process_document(
             )
             ui_id_counter += 1
 
-    return chunk_data, all_nodes
+    return chunk_data, all_nodes, node_id_to_children_map
+
+
+# Bump when the chunker or the cached tuple changes so stale pickles are ignored
+_CHUNK_CACHE_VERSION = "1"
+
+
+def _chunk_file(
+    file_path: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    cache_dir: Optional[str] = None,
+) -> Tuple[List[Dict], Dict[str, List[str]]]:
+    """
+    Worker for the process pool: chunk a file, dropping the heavy node objects.
+
+    When ``cache_dir`` is set, results are pickled there keyed by a hash of the
+    file content, its suffix, the chunking settings and the cache format version,
+    so unchanged files are not re-chunked.
+    """
+    cache_path = None
+    if cache_dir:
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        # The parser is chosen by file extension, so identical bytes under a
+        # different suffix must not share an entry
+        suffix = os.path.splitext(file_path)[1].lower()
+        digest.update(
+            f"{_CHUNK_CACHE_VERSION}:{suffix}:{chunk_size}:{chunk_overlap}".encode()
+        )
+        cache_path = os.path.join(cache_dir, f"{digest.hexdigest()}.pkl")
+        if os.path.exists(cache_path):
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+
+    chunk_data, _, node_id_to_children_map = process_document(
+        file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    result = (chunk_data, node_id_to_children_map)
+
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write then rename so concurrent workers never read a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    return result
 
 
 def filter_chunks_by_header(chunks: List[Dict], header_level: str) -> List[Dict]:
@@ -86,21 +154,22 @@ def filter_chunks_by_header(chunks: List[Dict], header_level: str) -> List[Dict]
 
     level = int(header_level) if header_level.isdigit() else None
 
-    # First identify chunks that match the specified level
+    # First identify chunks that match the specified level (None matches plain text)
     matched_chunks = []
-    if level is None:
-        matched_chunks = [chunk for chunk in chunks if chunk["header_level"] is None]
-    else:
-        matched_chunks = [chunk for chunk in chunks if chunk["header_level"] == level]
-
-    # Include chunks that are children of matched headers
-    matched_ids = {chunk["node_id"] for chunk in matched_chunks}
+    matched_ids = set()
+    included_ids = set()
+    for chunk in chunks:
+        if chunk["header_level"] == level:
+            matched_chunks.append(chunk)
+            matched_ids.add(chunk["node_id"])
+            included_ids.add(chunk["id"])
     included_chunks = matched_chunks.copy()
 
     # Also include any children of the matched headers
     for chunk in chunks:
-        if chunk["parent_id"] in matched_ids and chunk not in included_chunks:
+        if chunk["parent_id"] in matched_ids and chunk["id"] not in included_ids:
             included_chunks.append(chunk)
+            included_ids.add(chunk["id"])
 
     return included_chunks
 
@@ -121,55 +190,98 @@ def format_chunk_for_display(chunk: Dict) -> str:
     )
 
 
+_NO_DESCENDANTS: FrozenSet[str] = frozenset()
+
+
 def _get_all_descendant_node_ids(
-    start_node_id: str, node_id_to_children_map: Dict[str, List[str]]
-) -> set[str]:
+    start_node_id: str,
+    node_id_to_children_map: Dict[str, List[str]],
+    cache: Optional[Dict[str, FrozenSet[str]]] = None,
+) -> FrozenSet[str]:
     """
     Recursively get all descendant node IDs for a given starting node_id.
+
+    If a ``cache`` dict is given, results are memoized per start node and reused
+    for any already-expanded node met during the traversal.
     """
+    if cache is not None and start_node_id in cache:
+        return cache[start_node_id]
+
+    # Fast path for leaves, the majority of nodes in a typical document
+    children_ids = node_id_to_children_map.get(start_node_id)
+    if not children_ids:
+        return _NO_DESCENDANTS
+
     descendants = set()
-    queue = list(node_id_to_children_map.get(start_node_id, []))
+    queue = deque(children_ids)
     visited_in_bfs = {start_node_id}
 
     while queue:
-        current_child_id = queue.pop(0)
+        current_child_id = queue.popleft()
         if current_child_id in visited_in_bfs:
             continue
         visited_in_bfs.add(current_child_id)
         descendants.add(current_child_id)
 
+        # Reuse the subtree of an already-expanded node instead of walking it again
+        if cache is not None and current_child_id in cache:
+            descendants |= cache[current_child_id]
+            visited_in_bfs |= cache[current_child_id]
+            continue
+
         # Add grandchildren to the queue
         grandchildren = node_id_to_children_map.get(current_child_id, [])
         for grandchild_id in grandchildren:
             if grandchild_id not in visited_in_bfs:
                 queue.append(grandchild_id)
-    return descendants
+
+    descendants.discard(start_node_id)
+    result = frozenset(descendants)
+    if cache is not None:
+        cache[start_node_id] = result
+    return result
+
+
+def get_h1_indices(all_chunks: List[Dict]) -> List[int]:
+    """Return one chunk index per distinct H1 node_id (the last split of a split header)."""
+    return list(
+        {
+            chunk["node_id"]: i
+            for i, chunk in enumerate(all_chunks)
+            if chunk["header_level"] == 1
+        }.values()
+    )
 
 
-def build_h1_hierarchy(all_chunks: List[Dict]) -> Dict[str, Dict]:
+def build_h1_hierarchy(
+    all_chunks: List[Dict],
+    node_id_to_children_map: Dict[str, List[str]],
+    h1_indices: Optional[List[int]] = None,
+) -> Dict[str, Dict]:
     """
     Build a hierarchical structure of H1 sections with all their descendants.
     Returns a dict where keys are H1 node_ids and values contain the H1 chunk and all descendants.
+    Only the H1 chunks at ``h1_indices`` are expanded when given, otherwise all of them.
     """
+    if h1_indices is None:
+        h1_indices = get_h1_indices(all_chunks)
+
     # Build node_id → chunk mapping
     node_id_to_chunk = {chunk["node_id"]: chunk for chunk in all_chunks}
 
-    # Build children mapping
-    node_id_to_children_map = {}
-    for chunk in all_chunks:
-        node_id_to_children_map[chunk["node_id"]] = chunk["children_ids"]
-
-    # Find all H1 chunks
-    h1_chunks = [c for c in all_chunks if c.get("header_level") == 1]
+    h1_chunks = [all_chunks[i] for i in h1_indices]
 
     h1_hierarchy = {}
+    # Only the selected H1s are expanded; the shared cache lets overlapping
+    # subtrees be walked once
+    descendants_cache: Dict[str, FrozenSet[str]] = {}
 
     for h1_chunk in h1_chunks:
         h1_node_id = h1_chunk["node_id"]
 
         # Get all descendants of this H1
         all_descendants = _get_all_descendant_node_ids(
-            h1_node_id, node_id_to_children_map
+            h1_node_id, node_id_to_children_map, descendants_cache
         )
 
         # Collect all chunks for this H1 section (H1 + descendants)
@@ -191,6 +303,42 @@ def build_h1_hierarchy(all_chunks: List[Dict]) -> Dict[str, Dict]:
     return h1_hierarchy
 
 
+def _deduplicate_texts(
+    texts: List[str], threshold: float, num_perm: int = 64, shingle_size: int = 5
+) -> List[str]:
+    """
+    Drop texts that are near-duplicates of an earlier one using MinHash-LSH.
+
+    Texts are shingled into word n-grams; a text is kept only if no previously
+    kept text has an estimated Jaccard similarity of at least ``threshold``.
+    """
+    from datasketch import MinHash, MinHashLSH
+
+    lsh = MinHashLSH(threshold=threshold, num_perm=num_perm)
+    kept_minhashes: Dict[str, MinHash] = {}
+    kept = []
+    for i, text in enumerate(texts):
+        words = text.split()
+        shingles = {
+            " ".join(words[j : j + shingle_size])
+            for j in range(max(1, len(words) - shingle_size + 1))
+        }
+        minhash = MinHash(num_perm=num_perm)
+        minhash.update_batch([shingle.encode("utf-8") for shingle in shingles])
+        # LSH only returns candidates, which include false positives; confirm
+        # each one against the threshold before dropping the text
+        if any(
+            minhash.jaccard(kept_minhashes[key]) >= threshold
+            for key in lsh.query(minhash)
+        ):
+            continue
+        key = str(i)
+        lsh.insert(key, minhash)
+        kept_minhashes[key] = minhash
+        kept.append(text)
+    return kept
+
+
 providers = {
     "OLLAMA": LLMProviderType.OLLAMA,
     "OPENAI": LLMProviderType.OPENAI,
@@ -238,6 +386,27 @@ def get_args():
         default=200,
         help="Overlap between consecutive chunks.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of processes used to chunk a folder. Defaults to the CPU count.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=os.path.join(
+            os.path.expanduser("~"), ".cache", "qageneratorllm", "chunks"
+        ),
+        help="Folder caching chunked documents by content hash. Pass '' to disable.",
+    )
+    parser.add_argument(
+        "--dedup_threshold",
+        type=float,
+        default=None,
+        help="Drop near-duplicate chunks above this MinHash Jaccard similarity "
+        "(e.g. 0.85) before prompting. Requires `datasketch`. Disabled by default.",
+    )
     # ...existing code for more CLI arguments...
 
     args = parser.parse_args()
@@ -248,23 +417,33 @@ def cli_main(args):
     # 1. Load and chunk documents
     source_path = args.source
     all_chunks = []
+    node_id_to_children_map: Dict[str, List[str]] = {}
 
     # Check if the source is a directory or a file
     if os.path.isdir(source_path):
-        # If it's a directory, iterate over all files in the directory
-        for file_name in os.listdir(source_path):
-            file_path = os.path.join(source_path, file_name)
-            if os.path.isfile(file_path):
-                chunk_data, _ = process_document(
-                    file_path,
-                    chunk_size=args.chunk_size,
-                    chunk_overlap=args.chunk_overlap,
-                )
+        # If it's a directory, chunk all files in the directory in parallel
+        with os.scandir(source_path) as entries:
+            file_paths = [entry.path for entry in entries if entry.is_file()]
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            results = executor.map(
+                _chunk_file,
+                file_paths,
+                repeat(args.chunk_size),
+                repeat(args.chunk_overlap),
+                repeat(args.cache_dir),
+            )
+            for chunk_data, children_map in results:
+                # UI ids restart at 0 for every file; shift them to stay unique
+                offset = len(all_chunks)
+                for chunk in chunk_data:
+                    chunk["id"] += offset
                 all_chunks.extend(chunk_data)
+                for node_id, children_ids in children_map.items():
+                    node_id_to_children_map.setdefault(node_id, children_ids)
     elif os.path.isfile(source_path):
         # If it's a single file, process it directly
-        chunk_data, _ = process_document(
-            source_path, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+        chunk_data, node_id_to_children_map = _chunk_file(
+            source_path, args.chunk_size, args.chunk_overlap, args.cache_dir
         )
         all_chunks.extend(chunk_data)
     else:
@@ -273,43 +452,42 @@ def cli_main(args):
 
     logger.info(f"Total chunks processed: {len(all_chunks)}")
 
-    # Build H1 hierarchy
-    h1_hierarchy = build_h1_hierarchy(all_chunks)
-    logger.info(f"Found {len(h1_hierarchy)} H1 sections:")
-
-    for h1_node_id, h1_data in h1_hierarchy.items():
-        h1_chunk = h1_data["h1_chunk"]
-        descendant_count = h1_data["descendant_count"]
-        total_chunks = len(h1_data["all_chunks"])
-        logger.info(
-            f"  - {h1_chunk.get('title', 'Untitled')} ({total_chunks} chunks, {descendant_count} descendants)"
-        )
+    # Find H1 sections
+    h1_indices = get_h1_indices(all_chunks)
+    logger.info(f"Found {len(h1_indices)} H1 sections")
 
-    if not h1_hierarchy:
+    if not h1_indices:
         logger.error("No H1 headers found. Cannot generate questions.")
         return
 
-    # Randomly select H1 sections
-    h1_keys = list(h1_hierarchy.keys())
-    num_to_select = min(len(h1_keys), args.num)
-    selected_h1_keys = random.sample(h1_keys, num_to_select)
+    # Randomly select H1 sections by index, then expand only the selected ones
+    num_to_select = min(len(h1_indices), args.num)
+    selected_h1_indices = random.sample(h1_indices, num_to_select)
+    h1_hierarchy = build_h1_hierarchy(
+        all_chunks, node_id_to_children_map, selected_h1_indices
+    )
 
     logger.info(f"\nRandomly selected {num_to_select} H1 sections:")
 
     # Collect all chunks from selected H1 sections
     selected_chunks = []
-    for h1_key in selected_h1_keys:
-        h1_data = h1_hierarchy[h1_key]
+    for h1_data in h1_hierarchy.values():
         h1_chunk = h1_data["h1_chunk"]
         section_chunks = h1_data["all_chunks"]
         selected_chunks.extend(section_chunks)
         logger.info(
-            f"  - {h1_chunk.get('title', 'Untitled')} ({len(section_chunks)} chunks)"
+            f"  - {h1_chunk.get('title', 'Untitled')} ({len(section_chunks)} chunks, {h1_data['descendant_count']} descendants)"
         )
 
     # Sort all selected chunks by ID to maintain document order
     selected_chunks.sort(key=lambda x: x["id"])
-    combined_text = "\n\n".join(c["text"] for c in selected_chunks)
+    selected_texts = [c["text"] for c in selected_chunks]
+    if args.dedup_threshold is not None:
+        selected_texts = _deduplicate_texts(selected_texts, args.dedup_threshold)
+        logger.info(
+            f"Kept {len(selected_texts)} of {len(selected_chunks)} chunks after deduplication"
+        )
+    combined_text = "\n\n".join(selected_texts)
 
     logger.info(f"\nTotal selected chunks: {len(selected_chunks)}")
     logger.info(f"Combined text length: {len(combined_text)} characters")
@@ -335,12 +513,11 @@ def cli_main(args):
     output_file = os.path.join(args.output_dir, "generated_questions.json")
 
     with open(output_file, "w", encoding="utf-8") as f:
-        f.write(
-            json.dumps(
-                result.model_dump() if output_type == OutputType.DATACLASS else result,
-                indent=2,
-            )
-        )
+        if output_type == OutputType.DATACLASS:
+            # Serialize straight from the model, skipping the intermediate dict
+            f.write(result.model_dump_json(indent=2))
+        else:
+            json.dump(result, f, indent=2)
 
     logger.info(f"Generated questions saved to: {output_file}")
 
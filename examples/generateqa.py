@@ -1,7 +1,15 @@
-from typing import Dict, List, Tuple
+import hashlib
+import re
+import sys
+import threading
+from collections import OrderedDict, defaultdict, deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
 
 import gradio as gr
 from llama_index.core.schema import NodeRelationship, TextNode
+from llm_output_parser import parse_json
 
 from qageneratorllm.generator import LLMProviderType, QuestionGenerator, QuestionType
 from qageneratorllm.loader import chunk_document, sort_chunked_documents
@@ -10,10 +18,13 @@ from qageneratorllm.qa_dataclass import OutputType
 
 def process_document(
     file_path, chunk_size=1000, chunk_overlap=200
-) -> Tuple[List[Dict], List[TextNode]]:
-    """Process uploaded document and return chunks with metadata."""
+) -> Tuple[List[Dict], List[TextNode], Dict[str, List[str]]]:
+    """
+    Process uploaded document and return chunks with metadata, the underlying
+    nodes and a map from each original node_id to its children node_ids.
+    """
     if file_path is None:
-        return [], []
+        return [], [], {}
 
     # Chunk the document and organize by relationships
     chunked_doc = chunk_document(
@@ -23,6 +34,7 @@ def process_document(
 
     all_nodes: List[TextNode] = []
     chunk_data: List[Dict] = []
+    node_id_to_children_map: Dict[str, List[str]] = {}
     ui_id_counter = 0
 
     for _, nodes_in_group in organized_chunks.items():
@@ -34,26 +46,36 @@ def process_document(
 
             parent_relation = node.relationships.get(NodeRelationship.PARENT, {})
             parent_id = (
-                parent_relation.node_id if hasattr(parent_relation, "node_id") else None
+                sys.intern(parent_relation.node_id)
+                if hasattr(parent_relation, "node_id")
+                else None
             )
 
             children_relation = node.relationships.get(NodeRelationship.CHILD, [])
             children_ids = []
             if isinstance(children_relation, list):
                 children_ids = [
-                    child.node_id
+                    sys.intern(child.node_id)
                     for child in children_relation
                     if hasattr(child, "node_id")
                 ]
             elif hasattr(children_relation, "node_id"):
-                children_ids = [children_relation.node_id]
+                children_ids = [sys.intern(children_relation.node_id)]
+
+            # Intern node ids so every map and set below shares one string object
+            # per id, making hashing and equality checks identity-fast
+            node_id = sys.intern(node.node_id)
+
+            # Splits of the same original node share its children_ids
+            node_id_to_children_map.setdefault(node_id, children_ids)
 
             context_path = node.metadata.get("context", "")
+            title = node.metadata.get("title", f"Chunk {ui_id_counter}")
 
             chunk_data.append(
                 {
                     "id": ui_id_counter,
-                    "node_id": node.node_id,
+                    "node_id": node_id,
                     "text": node.text,
                     "header_level": header_level,
                     "header_tag": header_tag,
@@ -61,128 +83,335 @@ def process_document(
                     "children_ids": children_ids,
                     "context_path": context_path,
                     "metadata": node.metadata,
-                    "title": node.metadata.get("title", f"Chunk {ui_id_counter}"),
+                    "title": title,
+                    # Rendered once here instead of on every display refresh
+                    "display_heading": _display_heading(header_level, title),
                 }
             )
             ui_id_counter += 1
 
-    return chunk_data, all_nodes
+    return chunk_data, all_nodes, node_id_to_children_map
+
+
+def build_chunk_index(chunks: List[Dict]) -> Dict[str, Dict]:
+    """
+    Index chunks by header level and by parent node_id, keeping document order,
+    so header filters become dict lookups instead of scans over every chunk.
+    """
+    by_level: Dict[Optional[int], List[Dict]] = defaultdict(list)
+    by_parent: Dict[str, List[Dict]] = defaultdict(list)
+    for chunk in chunks:
+        by_level[chunk["header_level"]].append(chunk)
+        if chunk["parent_id"] is not None:
+            by_parent[chunk["parent_id"]].append(chunk)
+    return {"by_level": dict(by_level), "by_parent": dict(by_parent)}
 
 
-def filter_chunks_by_header(chunks: List[Dict], header_level: str) -> List[Dict]:
-    """Filter chunks by header level with option to include children."""
+def filter_chunks_by_header(
+    chunks: List[Dict], header_level: str, chunk_index: Optional[Dict]
+) -> List[Dict]:
+    """
+    Filter chunks by header level, followed by the direct children of the matched
+    headers. Pass the index from `build_chunk_index`; it is built on demand if None.
+    """
     if header_level == "all":
         return chunks
 
+    # None matches plain text
     level = int(header_level) if header_level.isdigit() else None
+    if chunk_index is None:
+        chunk_index = build_chunk_index(chunks)
 
-    # First identify chunks that match the specified level
-    matched_chunks = []
-    if level is None:
-        matched_chunks = [chunk for chunk in chunks if chunk["header_level"] is None]
-    else:
-        matched_chunks = [chunk for chunk in chunks if chunk["header_level"] == level]
+    # Matched chunks first, then their children, each in document order
+    matched_chunks = chunk_index["by_level"].get(level, [])
+    included_ids = {chunk["id"] for chunk in matched_chunks}
+    children = {
+        child["id"]: child
+        for node_id in dict.fromkeys(chunk["node_id"] for chunk in matched_chunks)
+        for child in chunk_index["by_parent"].get(node_id, ())
+        if child["id"] not in included_ids
+    }
+    return [*matched_chunks, *(children[ui_id] for ui_id in sorted(children))]
 
-    # Include chunks that are children of matched headers
-    matched_ids = {chunk["node_id"] for chunk in matched_chunks}
-    included_chunks = matched_chunks.copy()
 
-    # Also include any children of the matched headers
-    for chunk in chunks:
-        if chunk["parent_id"] in matched_ids and chunk not in included_chunks:
-            included_chunks.append(chunk)
+# Markdown heading marks indexed by header level; levels outside 1-6 are clamped
+_HEADING_MARKS = ("#", *("#" * level for level in range(1, 7)))
 
-    return included_chunks
+
+def _display_heading(header_level: Optional[int], title: str) -> str:
+    """Return the Markdown heading line for a chunk."""
+    return f"{_HEADING_MARKS[max(1, min(header_level or 1, 6))]} {title}"
 
 
 def format_chunk_for_display(chunk: Dict) -> str:
     """
     Return a Markdown string for the chunk, removing HTML.
     """
-    header_level = chunk.get("header_level") or 1
-    heading_symbol = "#" * max(1, min(header_level, 6))
-    context_str = (
-        f"**Context:** {chunk['context_path']}\n\n" if chunk.get("context_path") else ""
-    )
-    chunk_id = chunk["id"]
-    return (
-        f"{heading_symbol} {chunk.get('title', f'Chunk {chunk_id}')}\n\n"
-        f"{context_str}{chunk.get('text', '')}\n"
-    )
+    heading = chunk.get("display_heading")
+    if heading is None:
+        title = chunk.get("title")
+        if title is None:
+            title = f"Chunk {chunk['id']}"
+        heading = _display_heading(chunk.get("header_level"), title)
+    context_path = chunk.get("context_path")
+    context_str = f"**Context:** {context_path}\n\n" if context_path else ""
+    return f"{heading}\n\n{context_str}{chunk.get('text', '')}\n"
+
+
+_NO_DESCENDANTS: FrozenSet[str] = frozenset()
 
 
 def _get_all_descendant_node_ids(
-    start_node_id: str, node_id_to_children_map: Dict[str, List[str]]
-) -> set[str]:
+    start_node_id: str,
+    node_id_to_children_map: Dict[str, List[str]],
+    cache: Optional[Dict[str, FrozenSet[str]]] = None,
+) -> FrozenSet[str]:
     """
     Recursively get all descendant node IDs for a given starting node_id.
+
+    If a ``cache`` dict is given, results are memoized per start node and reused
+    for any already-expanded node met during the traversal.
     """
+    if cache is not None and start_node_id in cache:
+        return cache[start_node_id]
+
+    # Fast path for leaves, the majority of nodes in a typical document
+    children_ids = node_id_to_children_map.get(start_node_id)
+    if not children_ids:
+        return _NO_DESCENDANTS
+
     descendants = set()
-    queue = list(node_id_to_children_map.get(start_node_id, []))
+    queue = deque(children_ids)
     visited_in_bfs = {
         start_node_id
     }  # Keep track of nodes visited in this BFS traversal
 
     while queue:
-        current_child_id = queue.pop(0)
+        current_child_id = queue.popleft()
         if current_child_id in visited_in_bfs:
             continue
         visited_in_bfs.add(current_child_id)
         descendants.add(current_child_id)
 
+        # Reuse the subtree of an already-expanded node instead of walking it again
+        if cache is not None and current_child_id in cache:
+            descendants |= cache[current_child_id]
+            visited_in_bfs |= cache[current_child_id]
+            continue
+
         # Add grandchildren to the queue
         grandchildren = node_id_to_children_map.get(current_child_id, [])
         for grandchild_id in grandchildren:
             if grandchild_id not in visited_in_bfs:
                 queue.append(grandchild_id)
+
+    descendants.discard(start_node_id)
+    result = frozenset(descendants)
+    if cache is not None:
+        cache[start_node_id] = result
+    return result
+
+
+# Processed documents keyed by (content digest, file suffix, chunking settings)
+_DOCUMENT_CACHE: "OrderedDict[Tuple[str, str, int, int], Tuple]" = OrderedDict()
+_DOCUMENT_CACHE_SIZE = 8
+# Gradio runs handlers on worker threads; guards every access to the cache
+_DOCUMENT_CACHE_LOCK = threading.Lock()
+
+
+def _process_document_cached(
+    file_path: str, chunk_size: int, chunk_overlap: int
+) -> Tuple[List[Dict], Dict[str, FrozenSet[str]], Dict[str, Dict]]:
+    """
+    Chunk a document once per (content, chunking settings) and precompute its
+    descendant map and header-filter index.
+
+    Keying on a content digest rather than the path means re-uploading the same
+    file, which Gradio stores under a new temporary path, is still a cache hit.
+    """
+    digest = hashlib.blake2b(Path(file_path).read_bytes(), digest_size=16).hexdigest()
+    key = (digest, Path(file_path).suffix.lower(), chunk_size, chunk_overlap)
+
+    with _DOCUMENT_CACHE_LOCK:
+        cached = _DOCUMENT_CACHE.get(key)
+        if cached is not None:
+            _DOCUMENT_CACHE.move_to_end(key)
+            return cached
+
+    # Chunk outside the lock so other documents are not blocked meanwhile
+    chunk_data, _, node_id_to_children_map = process_document(
+        file_path, chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+    cached = (
+        chunk_data,
+        build_descendants_map(node_id_to_children_map),
+        build_chunk_index(chunk_data),
+    )
+    with _DOCUMENT_CACHE_LOCK:
+        _DOCUMENT_CACHE[key] = cached
+        if len(_DOCUMENT_CACHE) > _DOCUMENT_CACHE_SIZE:
+            _DOCUMENT_CACHE.popitem(last=False)
+    return cached
+
+
+@lru_cache(maxsize=16)
+def _get_generator(
+    provider: str, question_type: str, output_type: str
+) -> QuestionGenerator:
+    """Return a shared QuestionGenerator so LLM clients are not rebuilt on every click."""
+    return QuestionGenerator(
+        provider_type=provider, question_type=question_type, output_type=output_type
+    )
+
+
+def build_descendants_map(
+    node_id_to_children_map: Dict[str, List[str]],
+) -> Dict[str, FrozenSet[str]]:
+    """
+    Compute the descendant node IDs of every node in one bottom-up pass.
+
+    Nodes are visited in reverse topological order (Kahn's algorithm over the
+    child -> parent edges), so each node's set is the union of its children and
+    their already computed sets. Nodes caught in a cycle fall back to a BFS.
+    The unions cost O(sum of descendant set sizes), which pays off here because
+    the map is built once per document and reused by every generation request.
+    """
+    parent_ids: Dict[str, List[str]] = defaultdict(list)
+    pending_children: Dict[str, int] = {}
+    for node_id, children_ids in node_id_to_children_map.items():
+        unique_children_ids = set(children_ids)
+        pending_children[node_id] = len(unique_children_ids)
+        for child_id in unique_children_ids:
+            parent_ids[child_id].append(node_id)
+
+    # Children without an entry of their own are leaves
+    queue = deque(
+        node_id
+        for node_id in parent_ids.keys() | pending_children.keys()
+        if not pending_children.get(node_id)
+    )
+    descendants: Dict[str, FrozenSet[str]] = {}
+    while queue:
+        node_id = queue.popleft()
+        children_ids = node_id_to_children_map.get(node_id)
+        descendants[node_id] = (
+            frozenset(children_ids).union(
+                *(descendants[child_id] for child_id in children_ids)
+            )
+            if children_ids
+            else _NO_DESCENDANTS
+        )
+        for parent_id in parent_ids.get(node_id, ()):
+            pending_children[parent_id] -= 1
+            if pending_children[parent_id] == 0:
+                queue.append(parent_id)
+
+    for node_id in node_id_to_children_map:
+        if node_id not in descendants:
+            descendants[node_id] = _get_all_descendant_node_ids(
+                node_id, node_id_to_children_map, descendants
+            )
     return descendants
 
 
+def _code_block(text: str, language: str = "json") -> str:
+    """
+    Wrap text in a fenced code block whose fence is longer than any backtick run
+    in the text, so fences the model emits itself cannot close it early.
+    """
+    longest_run = max((len(run) for run in re.findall(r"`+", text)), default=0)
+    fence = "`" * max(3, longest_run + 1)
+    return f"{fence}{language}\n{text}\n{fence}"
+
+
+def format_questions_markdown(result: Dict, question_type: str) -> str:
+    """Format a parsed question bank as Markdown."""
+    # Collect every fragment in a single list and join once
+    if question_type == QuestionType.QA:
+        questions = result.get("open_ended_questions", [])
+        questions_markdown = ["### Generated Open-Ended Questions", "---"]
+        for i, q in enumerate(questions, 1):
+            questions_markdown.extend(
+                (
+                    f"**Q{i}:** {q['question_prompt']}",
+                    f"**Answer:** {q['reference_answer']}",
+                    "---",
+                )
+            )
+    else:
+        questions = result.get("mcq_questions", [])
+        questions_markdown = ["### Generated Multiple-Choice Questions", "---"]
+        for i, q in enumerate(questions, 1):
+            correct_ids = set(q["correct_option_ids"])
+            questions_markdown.extend(
+                (f"**Q{i}:** {q['question_text']}", "**Options:**")
+            )
+            for opt in q["answer_options"]:
+                correct_indicator = (
+                    " (Correct)" if opt["option_id"] in correct_ids else ""
+                )
+                questions_markdown.append(
+                    f"- {opt['option_id']}: {opt['option_text']}{correct_indicator}"
+                )
+            questions_markdown.extend(
+                (f"**Explanation:** {q['answer_explanation']}", "---")
+            )
+
+    return "\n\n".join(questions_markdown)
+
+
 def generate_questions(
     chunks: List[Dict],
+    node_id_to_descendants: Dict[str, FrozenSet[str]],
     selected_chunk_ui_ids: List[int],
     question_type: str,
     provider: str,
     num_questions: int,
-) -> Tuple[str, str]:
-    """Generate questions for selected chunks and all their descendants."""
+) -> Iterator[Tuple[str, str]]:
+    """
+    Generate questions for selected chunks and all their descendants.
+
+    Yields (questions, used chunks) Markdown pairs: the context is shown right away,
+    the raw response is streamed while the LLM writes it, and the formatted
+    questions replace it once the response is complete.
+    """
     if not selected_chunk_ui_ids:
-        return (
+        yield (
             "Please select at least one chunk to generate questions.",
             "No chunks selected.",
         )
+        return
 
-    # Build a map from original node_id to its children_ids for efficient lookup
-    node_id_to_children_map: Dict[str, List[str]] = {}
+    # Index chunks by UI ID and by original node_id (a node may have several splits)
+    # in a single pass, so every later query is a dict lookup
+    chunks_by_ui_id: Dict[int, Dict] = {}
+    node_id_to_chunks: Dict[str, List[Dict]] = defaultdict(list)
     for chunk_dict in chunks:
-        current_node_id = chunk_dict["node_id"]
-        if current_node_id not in node_id_to_children_map:
-            node_id_to_children_map[current_node_id] = chunk_dict["children_ids"]
-        # Assuming children_ids are consistent for all splits of the same original node_id
+        chunks_by_ui_id[chunk_dict["id"]] = chunk_dict
+        node_id_to_chunks[chunk_dict["node_id"]].append(chunk_dict)
 
     all_node_ids_for_generation = set()
 
     # For each UI ID selected by the user:
     for ui_id in selected_chunk_ui_ids:
-        # Find the corresponding chunk dictionary
-        selected_chunk_dict = next((cd for cd in chunks if cd["id"] == ui_id), None)
+        selected_chunk_dict = chunks_by_ui_id.get(ui_id)
         if not selected_chunk_dict:
             continue
 
         original_node_id = selected_chunk_dict["node_id"]
         all_node_ids_for_generation.add(original_node_id)
 
-        # Get all descendants of this original_node_id
-        descendants = _get_all_descendant_node_ids(
-            original_node_id, node_id_to_children_map
+        # Add all descendants of this original_node_id, precomputed per document
+        all_node_ids_for_generation.update(
+            node_id_to_descendants.get(original_node_id, ())
         )
-        all_node_ids_for_generation.update(descendants)
 
     # Collect texts from all relevant nodes (selected + descendants), including all their splits
-    relevant_texts_with_ui_id = []
-    for chunk_dict in chunks:
-        if chunk_dict["node_id"] in all_node_ids_for_generation:
-            relevant_texts_with_ui_id.append((chunk_dict["id"], chunk_dict["text"]))
+    relevant_texts_with_ui_id = [
+        (chunk_dict["id"], chunk_dict["text"])
+        for node_id in all_node_ids_for_generation
+        for chunk_dict in node_id_to_chunks.get(node_id, ())
+    ]
 
     # Sort by the original UI ID to maintain document order
     relevant_texts_with_ui_id.sort(key=lambda x: x[0])
@@ -190,73 +419,52 @@ def generate_questions(
     selected_texts = [text for _, text in relevant_texts_with_ui_id]
 
     if not selected_texts:
-        return (
+        yield (
             "No text found for the selected chunks and their descendants.",
             "No relevant text found.",
         )
+        return
 
     combined_text = "\n\n".join(selected_texts)
 
-    # Initialize question generator
-    question_generator = QuestionGenerator(
-        provider_type=provider,
-        question_type=question_type,
-        n_questions=num_questions,
-        output_type=OutputType.JSON,
-    )
-
-    # Generate questions
-    result = question_generator.invoke(combined_text)
-
-    # Format the result as Markdown
-    questions_markdown = []
-    if question_type == QuestionType.QA:
-        questions = result.get("open_ended_questions", [])
-        questions_markdown.append("### Generated Open-Ended Questions")
-        questions_markdown.append("---")
-        for i, q in enumerate(questions, 1):
-            questions_markdown.append(f"**Q{i}:** {q['question_prompt']}")
-            questions_markdown.append(f"**Answer:** {q['reference_answer']}")
-            questions_markdown.append("---")
-    else:
-        questions = result.get("mcq_questions", [])
-        questions_markdown.append("### Generated Multiple-Choice Questions")
-        questions_markdown.append("---")
-        for i, q in enumerate(questions, 1):
-            questions_markdown.append(f"**Q{i}:** {q['question_text']}")
-            questions_markdown.append("**Options:**")
-            for opt in q["answer_options"]:
-                correct_indicator = (
-                    " (Correct)" if opt["option_id"] in q["correct_option_ids"] else ""
-                )
-                questions_markdown.append(
-                    f"- {opt['option_id']}: {opt['option_text']}{correct_indicator}"
-                )
-            questions_markdown.append(f"**Explanation:** {q['answer_explanation']}")
-            questions_markdown.append("---")
-
-    formatted_questions_output = "\n\n".join(questions_markdown)
-
     # Format the used chunks as Markdown instead of HTML
     used_chunks_md_parts = ["### Context Used for Generation:\n"]
-    chunks_by_ui_id = {chunk["id"]: chunk for chunk in chunks}
 
-    # Get unique UI IDs from relevant_texts_with_ui_id, maintaining order
-    ordered_used_ui_ids = []
-    seen_ui_ids = set()
-    for ui_id, _ in relevant_texts_with_ui_id:
-        if ui_id not in seen_ui_ids:
-            ordered_used_ui_ids.append(ui_id)
-            seen_ui_ids.add(ui_id)
+    # Each chunk contributes exactly one entry, so the sorted UI IDs are already unique
+    ordered_used_ui_ids = [ui_id for ui_id, _ in relevant_texts_with_ui_id]
 
     for ui_id in ordered_used_ui_ids:
         chunk_to_display = chunks_by_ui_id.get(ui_id)
         if chunk_to_display:
-            used_chunks_md_parts.append(format_chunk_for_display(chunk_to_display))
-            used_chunks_md_parts.append("---\n")
+            used_chunks_md_parts.extend(
+                (format_chunk_for_display(chunk_to_display), "---\n")
+            )
     formatted_used_chunks_markdown = "\n".join(used_chunks_md_parts)
 
-    return formatted_questions_output, formatted_used_chunks_markdown
+    yield "*Generating questions...*", formatted_used_chunks_markdown
+
+    # Reuse a cached question generator; the question count is passed per call
+    question_generator = _get_generator(provider, question_type, OutputType.JSON)
+
+    # Stream the raw response so the user sees progress before it completes
+    response_parts = []
+    for delta in question_generator.stream(combined_text, n_questions=num_questions):
+        response_parts.append(delta)
+        yield _code_block("".join(response_parts)), formatted_used_chunks_markdown
+
+    try:
+        result = parse_json("".join(response_parts))
+    except ValueError:
+        yield (
+            "The model response could not be parsed as JSON. Please try again.",
+            formatted_used_chunks_markdown,
+        )
+        return
+
+    yield (
+        format_questions_markdown(result, question_type),
+        formatted_used_chunks_markdown,
+    )
 
 
 def create_app():
@@ -348,31 +556,23 @@ def create_app():
 
         # State variables to store processed data
         chunks_state = gr.State([])
+        descendants_state = gr.State({})
+        chunk_index_state = gr.State(None)
 
         # Event handlers
-        def update_ui(file, header_level, size, overlap):
-            if file is None:
-                return (
-                    gr.Markdown(value="Please upload a document first."),
-                    gr.Dropdown(choices=[]),
-                    [],
-                )
-
-            chunk_data, _ = process_document(
-                file, chunk_size=size, chunk_overlap=overlap
-            )
-            filtered_chunks = filter_chunks_by_header(chunk_data, header_level)
-
+        def render_chunks(filtered_chunks):
             # Build Markdown output for filtered chunks
             chunks_markdown = ["# Document Chunks\n"]
             for chunk in filtered_chunks:
                 chunks_markdown.append(format_chunk_for_display(chunk))
                 chunks_markdown.append("---\n")
-            markdown_output = "\n".join(chunks_markdown)
+            return gr.Markdown(value="\n".join(chunks_markdown))
 
-            # Prepare chunk selector labels
+        def build_chunk_choices(chunks):
+            # Selector labels for every chunk; ids are stable, so these only
+            # change when the document is processed again
             chunk_choices = []
-            for chunk in filtered_chunks:
+            for chunk in chunks:
                 label = f"Chunk {chunk['id']}"
                 if chunk.get("header_level"):
                     label += f" (H{chunk['header_level']})"
@@ -384,35 +584,73 @@ def create_app():
                     )
                     label += f": {path_preview}"
                 chunk_choices.append((label, chunk["id"]))
+            return gr.Dropdown(choices=chunk_choices, value=[])
 
+        def process_once(file, header_level, size, overlap):
+            if file is None:
+                return (
+                    gr.Markdown(value="Please upload a document first."),
+                    gr.Dropdown(choices=[], value=[]),
+                    [],
+                    {},
+                    None,
+                )
+
+            file_path = getattr(file, "name", file)
+            chunk_data, node_id_to_descendants, chunk_index = _process_document_cached(
+                file_path, size, overlap
+            )
+            filtered_chunks = filter_chunks_by_header(
+                chunk_data, header_level, chunk_index
+            )
             return (
-                gr.Markdown(value=markdown_output),
-                gr.Dropdown(choices=chunk_choices),
+                render_chunks(filtered_chunks),
+                build_chunk_choices(chunk_data),
                 chunk_data,
+                node_id_to_descendants,
+                chunk_index,
             )
 
+        def refilter(chunks, chunk_index, header_level):
+            if not chunks:
+                return gr.Markdown(value="Please upload a document first.")
+            return render_chunks(
+                filter_chunks_by_header(chunks, header_level, chunk_index)
+            )
+
+        process_outputs = [
+            chunks_output,
+            chunk_selector,
+            chunks_state,
+            descendants_state,
+            chunk_index_state,
+        ]
+
         process_btn.click(
-            fn=update_ui,
+            fn=process_once,
             inputs=[file_input, header_filter, chunk_size, chunk_overlap],
-            outputs=[chunks_output, chunk_selector, chunks_state],
+            outputs=process_outputs,
         )
 
         file_input.upload(
-            fn=update_ui,
+            fn=process_once,
             inputs=[file_input, header_filter, chunk_size, chunk_overlap],
-            outputs=[chunks_output, chunk_selector, chunks_state],
+            outputs=process_outputs,
         )
 
+        # Changing the filter only re-renders the chunk view; the selector and
+        # the user's selection are left untouched
         header_filter.change(
-            fn=update_ui,
-            inputs=[file_input, header_filter, chunk_size, chunk_overlap],
-            outputs=[chunks_output, chunk_selector, chunks_state],
+            fn=refilter,
+            inputs=[chunks_state, chunk_index_state, header_filter],
+            outputs=[chunks_output],
         )
 
         generate_btn.click(
             fn=generate_questions,
             inputs=[
                 chunks_state,
+                descendants_state,
                 chunk_selector,
                 question_type_dropdown,
                 provider_dropdown,
@@ -1,8 +1,11 @@
+import os
+
 from .generator import (
     LLMProviderType,
     ModelName,
     QuestionGenerator,
     QuestionType,
+    enable_llm_cache,
 )
 from .qa_dataclass import (
     MultipleChoiceQuestion,
@@ -11,6 +14,12 @@ from .qa_dataclass import (
     OpenEndedQuestionBank,
 )
 
+if os.getenv("QAGEN_CACHE"):
+    # "memory" keeps responses for the process lifetime, anything else is a SQLite path
+    enable_llm_cache(
+        None if os.environ["QAGEN_CACHE"] == "memory" else os.environ["QAGEN_CACHE"]
+    )
+
 __version__ = "0.1.0"
 __all__ = [
     "LLMProviderType",
@@ -21,4 +30,5 @@ __all__ = [
     "OpenEndedQuestionBank",
     "QuestionGenerator",
     "QuestionType",
+    "enable_llm_cache",
 ]
@@ -1,15 +1,19 @@
 import argparse
+import asyncio
+import hashlib
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-from langchain_anthropic import ChatAnthropic
-from langchain_groq import ChatGroq
-from langchain_ollama import ChatOllama
-from langchain_openai import ChatOpenAI
-from langchain_xai import ChatXAI
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.language_models import BaseChatModel
+from langchain_core.prompts import ChatPromptTemplate
 from llm_output_parser import parse_json
+from pydantic import TypeAdapter
 
 from .qa_dataclass import (
     LLMProviderType,
@@ -28,6 +32,101 @@ def get_example_json(
     return json.dumps(example.model_dump(), indent=2)
 
 
+@lru_cache(maxsize=None)
+def _bank_list_adapter(qa_type: type) -> TypeAdapter:
+    """Build the validator for a list of question banks once per bank type."""
+    return TypeAdapter(List[qa_type])
+
+
+@lru_cache(maxsize=None)
+def _get_chat_model(
+    provider_type: str, model_name: Optional[str] = None, num_ctx: Optional[int] = 4096
+) -> BaseChatModel:
+    """
+    Create the chat model for a provider, importing only that provider's package.
+
+    Instances are memoized per (provider, model, context size) so repeated
+    QuestionGenerator construction reuses the same client.
+    """
+    if provider_type == LLMProviderType.ANTHROPIC:
+        from langchain_anthropic import ChatAnthropic
+
+        chat_class, default_model = ChatAnthropic, ModelName.ANTHROPIC
+    elif provider_type == LLMProviderType.OLLAMA:
+        from langchain_ollama import ChatOllama
+
+        chat_class, default_model = ChatOllama, ModelName.OLLAMA
+    elif provider_type == LLMProviderType.OPENAI:
+        from langchain_openai import ChatOpenAI
+
+        chat_class, default_model = ChatOpenAI, ModelName.OPENAI
+    elif provider_type == LLMProviderType.XAI:
+        from langchain_xai import ChatXAI
+
+        chat_class, default_model = ChatXAI, ModelName.XAI
+    elif provider_type == LLMProviderType.GROQ:
+        from langchain_groq import ChatGroq
+
+        chat_class, default_model = ChatGroq, ModelName.GROQ
+    else:
+        raise ValueError("Invalid LLM provider type")
+
+    chat_kwargs = {"model": model_name or default_model}
+    if num_ctx is not None:
+        chat_kwargs["num_ctx"] = num_ctx
+    return chat_class(**chat_kwargs)
+
+
+def enable_llm_cache(database_path: Optional[str] = None) -> None:
+    """
+    Cache LLM responses so identical prompts skip the provider round-trip.
+
+    The cache key covers the full rendered prompt (format example included) and
+    the model settings, so structured and JSON outputs are cached separately.
+    Uses an in-memory cache when `database_path` is None, otherwise a SQLite file,
+    which requires the optional `cache` extra (`langchain-community`).
+    """
+    if database_path is None:
+        cache = InMemoryCache()
+    else:
+        try:
+            from langchain_community.cache import SQLiteCache
+        except ImportError as e:
+            raise ImportError(
+                "A SQLite LLM cache requires langchain-community; install it with "
+                "`pip install qageneratorllm[cache]`, or use an in-memory cache "
+                "(QAGEN_CACHE=memory)."
+            ) from e
+
+        cache = SQLiteCache(database_path=database_path)
+    set_llm_cache(cache)
+
+
+def _load_checkpoint(output_jsonl: str) -> Dict[str, Any]:
+    """Read the results already recorded in a JSONL checkpoint, keyed by file key."""
+    done = {}
+    if not os.path.exists(output_jsonl):
+        return done
+    with open(output_jsonl, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A record cut short by an interrupted run; it will be regenerated
+                continue
+            done[record["key"]] = record["result"]
+    return done
+
+
+def _ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
 class QuestionGenerator:
     """A class that generates multiple-choice or open-ended questions using various LLM providers."""
 
@@ -40,33 +139,7 @@ class QuestionGenerator:
         output_type: str = OutputType.DATACLASS,
         num_ctx: int = 4096,
     ):
-        if provider_type == LLMProviderType.ANTHROPIC:
-            anthropic_kwargs = {"model": model_name or ModelName.ANTHROPIC}
-            if num_ctx is not None:
-                anthropic_kwargs["num_ctx"] = num_ctx
-            self.llm = ChatAnthropic(**anthropic_kwargs)
-        elif provider_type == LLMProviderType.OLLAMA:
-            ollama_kwargs = {"model": model_name or ModelName.OLLAMA}
-            if num_ctx is not None:
-                ollama_kwargs["num_ctx"] = num_ctx
-            self.llm = ChatOllama(**ollama_kwargs)
-        elif provider_type == LLMProviderType.OPENAI:
-            openai_kwargs = {"model": model_name or ModelName.OPENAI}
-            if num_ctx is not None:
-                openai_kwargs["num_ctx"] = num_ctx
-            self.llm = ChatOpenAI(**openai_kwargs)
-        elif provider_type == LLMProviderType.XAI:
-            xai_kwargs = {"model": model_name or ModelName.XAI}
-            if num_ctx is not None:
-                xai_kwargs["num_ctx"] = num_ctx
-            self.llm = ChatXAI(**xai_kwargs)
-        elif provider_type == LLMProviderType.GROQ:
-            groq_kwargs = {"model": model_name or ModelName.GROQ}
-            if num_ctx is not None:
-                groq_kwargs["num_ctx"] = num_ctx
-            self.llm = ChatGroq(**groq_kwargs)
-        else:
-            raise ValueError("Invalid LLM provider type")
+        self.llm = _get_chat_model(provider_type, model_name, num_ctx)
 
         if question_type == QuestionType.MCQ:
             from .prompts.mcq_prompt import HUMAN, SYSTEM
@@ -77,33 +150,23 @@ class QuestionGenerator:
 
             self.qa_type = OpenEndedQuestionBank
 
-        self.human, self.system, self.template_format = (
-            HUMAN,
-            SYSTEM,
-            get_example_json(self.qa_type.example()),
-        )
+        # Compile the prompt once, with the output format example bound up front
+        self.prompt = ChatPromptTemplate.from_messages(
+            [("system", SYSTEM), ("user", HUMAN)]
+        ).partial(FORMAT=get_example_json(self.qa_type.example()))
         self.n_questions = n_questions
         self.output_type = output_type
 
         # Only create structured_llm if using dataclass output
         if self.output_type == OutputType.DATACLASS:
             self.structured_llm = self.llm.with_structured_output(self.qa_type)
+            self.chain = self.prompt | self.structured_llm
+        else:
+            self.chain = self.prompt | self.llm
 
-    def prepare(
-        self, context: str, source: str, n_questions: int
-    ) -> List[Tuple[str, str]]:
-        return [
-            ("system", self.system),
-            (
-                "user",
-                self.human.format(
-                    SOURCE=source,
-                    N_QUESTION=n_questions,
-                    CONTEXT=context,
-                    FORMAT=self.template_format,
-                ),
-            ),
-        ]
+    def prepare(self, context: str, source: str, n_questions: int) -> Dict[str, Any]:
+        """Return the prompt variables for one context, as expected by `self.chain`."""
+        return {"SOURCE": source, "N_QUESTION": n_questions, "CONTEXT": context}
 
     def invoke(
         self, prompt: str, source: str = None, n_questions: int = None
@@ -113,13 +176,46 @@ class QuestionGenerator:
             prompt, source, n_questions or self.n_questions
         )
 
+        response = self.chain.invoke(prepared_messages)
         if self.output_type == OutputType.DATACLASS:
-            return self.structured_llm.invoke(prepared_messages)
+            return response
         else:
             # For JSON output, parse the raw response
-            raw_response = self.llm.invoke(prepared_messages)
-            content = parse_json(raw_response.content)
-            return content
+            return parse_json(response.content)
+
+    def stream(
+        self,
+        prompt: str,
+        source: Optional[str] = None,
+        n_questions: Optional[int] = None,
+    ) -> Iterator[Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, str]]:
+        """
+        Yield the response while it is generated.
+
+        JSON output yields raw text deltas to be joined and passed to `parse_json`;
+        dataclass output yields whatever the structured model streams, which is a
+        single question bank for providers without partial structured output.
+        Streaming never consults the global LLM cache, so when one is enabled the
+        full response is fetched with `invoke` and yielded as a single item.
+        """
+        source = source if source else "general knowledge"
+        prepared_messages = self.prepare(
+            prompt, source, n_questions or self.n_questions
+        )
+
+        if get_llm_cache() is not None:
+            response = self.chain.invoke(prepared_messages)
+            if self.output_type == OutputType.DATACLASS:
+                yield response
+            else:
+                yield response.content
+            return
+
+        for chunk in self.chain.stream(prepared_messages):
+            if self.output_type == OutputType.DATACLASS:
+                yield chunk
+            else:
+                yield chunk.content
 
     def batch_invoke(
         self, prompts: list[str], sources: list[str] = None, n_questions: int = None
@@ -130,34 +226,140 @@ class QuestionGenerator:
             for prompt, source in zip(prompts, sources, strict=False)
         ]
 
+        responses = self.chain.batch(prepared_messages)
         if self.output_type == OutputType.DATACLASS:
-            return self.structured_llm.batch(prepared_messages)
+            return responses
         else:
             # For JSON output, process each response
-            raw_responses = self.llm.batch(prepared_messages)
-            results = []
-            for response in raw_responses:
-                content = parse_json(response.content)
-                results.append(content)
-            return results
-
-    def _get_content(self, file_path: str) -> str:
-        with open(file_path, "r") as file:
-            context = file.read()
-            root, _ = os.path.splitext(file_path)
-            source = os.path.basename(root)
-            return context, source
+            return [parse_json(response.content) for response in responses]
+
+    async def abatch_invoke(
+        self,
+        prompts: list[str],
+        sources: Optional[list[str]] = None,
+        n_questions: Optional[int] = None,
+        max_concurrency: int = 5,
+    ) -> List[Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, Dict[str, Any]]]:
+        """Invoke the LLM concurrently on several prompts, keeping at most `max_concurrency` calls in flight."""
+        sources = sources if sources else ["africa history"] * len(prompts)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def _invoke_one(
+            prompt: str, source: str
+        ) -> Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, Dict[str, Any]]:
+            prepared_messages = self.prepare(
+                prompt, source, n_questions or self.n_questions
+            )
+            async with semaphore:
+                response = await self.chain.ainvoke(prepared_messages)
+            if self.output_type == OutputType.DATACLASS:
+                return response
+            return parse_json(response.content)
+
+        return await asyncio.gather(
+            *(
+                _invoke_one(prompt, source)
+                for prompt, source in zip(prompts, sources, strict=False)
+            )
+        )
+
+    def _get_content(self, file_path: str) -> Tuple[str, str]:
+        path = Path(file_path)
+        return path.read_text(encoding="utf-8"), path.stem
+
+    async def _aget_content(self, file_path: str) -> Tuple[str, str]:
+        return await asyncio.to_thread(self._get_content, file_path)
+
+    def _read_contents(self, file_paths: list[str]) -> list[tuple[str, str]]:
+        """Read files concurrently; threads overlap the blocking reads."""
+        if len(file_paths) <= 1:
+            return [self._get_content(file_path) for file_path in file_paths]
+        with ThreadPoolExecutor(max_workers=min(16, len(file_paths))) as executor:
+            return list(executor.map(self._get_content, file_paths))
 
     def invoke_from_file(self, file_path: str, n_questions: int = None) -> str:
         context, source = self._get_content(file_path)
         return self.invoke(context, source, n_questions)
 
-    def batch_invoke_from_files(self, file_paths: list[str], n_questions: int = None):
-        contexts, sources = zip(
-            *[self._get_content(file_path) for file_path in file_paths], strict=False
-        )
+    def batch_invoke_from_files(
+        self,
+        file_paths: list[str],
+        n_questions: Optional[int] = None,
+        output_jsonl: Optional[str] = None,
+    ) -> List[Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, Dict[str, Any]]]:
+        """
+        Generate questions for each file.
+
+        When `output_jsonl` is given, each result is appended to it as soon as it
+        completes and files already recorded there are skipped, so an interrupted
+        run resumes where it stopped instead of paying for the same LLM calls again.
+        """
+        if output_jsonl is not None:
+            return self._batch_invoke_from_files_checkpointed(
+                file_paths, n_questions, output_jsonl
+            )
+        contexts, sources = zip(*self._read_contents(file_paths), strict=False)
         return self.batch_invoke(contexts, sources, n_questions)
 
+    def _batch_invoke_from_files_checkpointed(
+        self, file_paths: list[str], n_questions: Optional[int], output_jsonl: str
+    ) -> List[Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, Dict[str, Any]]]:
+        keys = [
+            hashlib.sha256(str(file_path).encode("utf-8")).hexdigest()[:16]
+            for file_path in file_paths
+        ]
+        done = _load_checkpoint(output_jsonl)
+
+        pending = [i for i, key in enumerate(keys) if key not in done]
+        if pending:
+            prepared_messages = [
+                self.prepare(context, source, n_questions or self.n_questions)
+                for context, source in self._read_contents(
+                    [file_paths[i] for i in pending]
+                )
+            ]
+
+            output = Path(output_jsonl)
+            output.parent.mkdir(parents=True, exist_ok=True)
+            with open(output, "a", encoding="utf-8") as f:
+                # Do not glue the first record onto a line cut short by a crash
+                if output.stat().st_size and not _ends_with_newline(output):
+                    f.write("\n")
+                for j, response in self.chain.batch_as_completed(prepared_messages):
+                    i = pending[j]
+                    if self.output_type == OutputType.DATACLASS:
+                        result = response.model_dump()
+                    else:
+                        result = parse_json(response.content)
+                    record = {
+                        "key": keys[i],
+                        "file": str(file_paths[i]),
+                        "result": result,
+                    }
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                    done[keys[i]] = result
+
+        results = [done[key] for key in keys]
+        if self.output_type == OutputType.DATACLASS:
+            return _bank_list_adapter(self.qa_type).validate_python(results)
+        return results
+
+    async def abatch_invoke_from_files(
+        self,
+        file_paths: list[str],
+        n_questions: Optional[int] = None,
+        max_concurrency: int = 5,
+    ) -> List[Union[MultipleChoiceQuestionBank, OpenEndedQuestionBank, Dict[str, Any]]]:
+        contents = await asyncio.gather(
+            *(self._aget_content(file_path) for file_path in file_paths)
+        )
+        contexts, sources = zip(*contents, strict=False)
+        return await self.abatch_invoke(
+            contexts, sources, n_questions, max_concurrency=max_concurrency
+        )
+
     def save_result(
         self,
         result: Union[
@@ -167,10 +369,11 @@ class QuestionGenerator:
     ):
         output = Path(output_path)
         output.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, "w", encoding="utf-8") as f:
-            if self.output_type == OutputType.DATACLASS:
-                json.dump(result.model_dump(), f, ensure_ascii=False, indent=2)
-            else:
+        if self.output_type == OutputType.DATACLASS:
+            # Serialize on pydantic's native path instead of dumping to dicts first
+            output.write_text(result.model_dump_json(indent=2), encoding="utf-8")
+        else:
+            with open(output, "w", encoding="utf-8") as f:
                 json.dump(result, f, ensure_ascii=False, indent=2)
 
     def batch_invoke_from_folder(self, folder_path: str, n_questions: int = None):
@@ -217,13 +420,13 @@ if __name__ == "__main__":
                 generator.save_result(result, str(output_path))
         else:
             print(
-                json.dumps(
-                    [r.model_dump() for r in results], ensure_ascii=False, indent=2
-                )
+                _bank_list_adapter(generator.qa_type)
+                .dump_json(results, indent=2)
+                .decode("utf-8")
             )
     else:
         result = generator.invoke_from_file(args.input)
         if args.output:
             generator.save_result(result, args.output)
         else:
-            print(json.dumps(result.dict(), ensure_ascii=False, indent=2))
+            print(result.model_dump_json(indent=2))
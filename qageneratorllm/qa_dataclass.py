@@ -1,4 +1,5 @@
 import os
+import sys
 from typing import List
 
 from pydantic import BaseModel, Field, field_validator
@@ -14,6 +15,12 @@ class MultipleChoiceOption(BaseModel):
         description="The text content of this multiple choice option"
     )
 
+    @field_validator("option_id")
+    @classmethod
+    def intern_option_id(cls, option_id: str) -> str:
+        # Option ids repeat across every question; share one string per id
+        return sys.intern(option_id)
+
 
 class MultipleChoiceQuestion(BaseModel):
     """A question with multiple predefined answer options where one or more options are correct."""
@@ -53,7 +60,7 @@ class MultipleChoiceQuestion(BaseModel):
                 raise ValueError(
                     f"Invalid answer option '{option_id}'. Must be one of {sorted(available_ids)}"
                 )
-        return correct_ids
+        return [sys.intern(option_id) for option_id in correct_ids]
 
 
 class MultipleChoiceQuestionBank(BaseModel):
@@ -0,0 +1,35 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def cli_generate():
+    # Loaded lazily so unittest discovery can import this module without the
+    # example's dependencies
+    pytest.importorskip("datasketch")
+    module_path = Path(__file__).parent.parent / "examples" / "cli_generate.py"
+    spec = importlib.util.spec_from_file_location("cli_generate", module_path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        pytest.skip(f"cli_generate dependencies unavailable: {e}")
+    return module
+
+
+def test_deduplicate_texts_drops_only_near_duplicates(cli_generate):
+    base = " ".join(f"word{i}" for i in range(60))
+    near_duplicate = base + " extra"
+    # Replacing the last ten words keeps this an LSH candidate of `base`, but its
+    # Jaccard similarity (~0.7) is below the threshold, so it must be kept
+    similar = " ".join(
+        [f"word{i}" for i in range(50)] + [f"other{i}" for i in range(10)]
+    )
+
+    kept = cli_generate._deduplicate_texts(
+        [base, near_duplicate, similar], threshold=0.8
+    )
+
+    assert kept == [base, similar]
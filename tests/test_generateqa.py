@@ -0,0 +1,75 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def generateqa():
+    # Loaded lazily so unittest discovery can import this module without the
+    # example's dependencies
+    pytest.importorskip("gradio")
+    module_path = Path(__file__).parent.parent / "examples" / "generateqa.py"
+    spec = importlib.util.spec_from_file_location("generateqa", module_path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        pytest.skip(f"generateqa dependencies unavailable: {e}")
+    return module
+
+
+def test_build_descendants_map(generateqa):
+    children_map = {
+        "root": ["a", "b"],
+        "a": ["a1", "a2"],
+        "b": ["a2", "b1"],
+        "a1": [],
+        "b1": ["b2"],
+    }
+
+    descendants = generateqa.build_descendants_map(children_map)
+
+    assert descendants["root"] == {"a", "b", "a1", "a2", "b1", "b2"}
+    assert descendants["a"] == {"a1", "a2"}
+    assert descendants["b"] == {"a2", "b1", "b2"}
+    assert descendants["a1"] == frozenset()
+    assert descendants["b2"] == frozenset()
+
+
+def test_build_descendants_map_with_cycle(generateqa):
+    children_map = {
+        "root": ["x"],
+        "x": ["y", "leaf"],
+        "y": ["x"],
+        "leaf": [],
+    }
+
+    descendants = generateqa.build_descendants_map(children_map)
+
+    assert descendants["leaf"] == frozenset()
+    for node_id in children_map:
+        assert descendants[node_id] == generateqa._get_all_descendant_node_ids(
+            node_id, children_map
+        )
+    assert descendants["root"] == {"x", "y", "leaf"}
+    assert descendants["x"] == {"y", "leaf"}
+    assert descendants["y"] == {"x", "leaf"}
+
+
+def test_filter_chunks_by_header(generateqa):
+    chunks = [
+        {"id": 0, "node_id": "h1", "header_level": 1, "parent_id": None},
+        {"id": 1, "node_id": "p1", "header_level": None, "parent_id": "h1"},
+        {"id": 2, "node_id": "h2", "header_level": 2, "parent_id": "h1"},
+        {"id": 3, "node_id": "p2", "header_level": None, "parent_id": "h2"},
+        {"id": 4, "node_id": "h1b", "header_level": 1, "parent_id": None},
+    ]
+
+    filtered = generateqa.filter_chunks_by_header(chunks, "1", None)
+    assert [chunk["id"] for chunk in filtered] == [0, 4, 1, 2]
+
+    chunk_index = generateqa.build_chunk_index(chunks)
+    filtered = generateqa.filter_chunks_by_header(chunks, "2", chunk_index)
+    assert [chunk["id"] for chunk in filtered] == [2, 3]
+    assert generateqa.filter_chunks_by_header(chunks, "all", chunk_index) is chunks
@@ -1,8 +1,17 @@
+import asyncio
 import json
+import sys
 
 import pytest
-
-from qageneratorllm import LLMProviderType, QuestionGenerator, QuestionType
+from langchain_core.caches import InMemoryCache
+from langchain_core.globals import get_llm_cache, set_llm_cache
+
+from qageneratorllm import (
+    LLMProviderType,
+    QuestionGenerator,
+    QuestionType,
+    enable_llm_cache,
+)
 from qageneratorllm.qa_dataclass import (
     MultipleChoiceQuestionBank,
     OpenEndedQuestionBank,
@@ -29,8 +38,7 @@ def test_invoke_qa(monkeypatch, sample_context, sample_qa_response):
     def mock_init(self, *args, **kwargs):
         self.qa_type = OpenEndedQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.structured_llm = MockStructuredLLM()
+        self.chain = MockStructuredLLM()
         self.output_type = OutputType.DATACLASS
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -53,8 +61,7 @@ def test_invoke_mcq(monkeypatch, sample_context, sample_mcq_response):
     def mock_init(self, *args, **kwargs):
         self.qa_type = kwargs.get("question_type")
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.structured_llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.DATACLASS
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -76,8 +83,7 @@ def test_invoke_from_file(monkeypatch, temp_text_file):
     def mock_init(self, *args, **kwargs):
         self.qa_type = OpenEndedQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.structured_llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.DATACLASS
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -94,8 +100,7 @@ def test_batch_invoke(monkeypatch, sample_context):
     def mock_init(self, *args, **kwargs):
         self.qa_type = OpenEndedQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.structured_llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.DATACLASS
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -119,8 +124,7 @@ def test_invoke_json_qa(monkeypatch, sample_context, sample_qa_response):
     def mock_init(self, *args, **kwargs):
         self.qa_type = OpenEndedQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.JSON
 
     # Get sample data as JSON
@@ -158,8 +162,7 @@ def test_invoke_json_mcq(monkeypatch, sample_context, sample_mcq_response):
     def mock_init(self, *args, **kwargs):
         self.qa_type = MultipleChoiceQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.JSON
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -179,6 +182,65 @@ def test_invoke_json_mcq(monkeypatch, sample_context, sample_mcq_response):
     )
 
 
+def test_stream_json(monkeypatch, sample_context, sample_qa_response):
+    class MockMessageChunk:
+        def __init__(self, content):
+            self.content = content
+
+    response_json = json.dumps(sample_qa_response.model_dump())
+
+    class MockLLM:
+        def stream(self, inputs):
+            assert inputs["CONTEXT"] == sample_context
+            for i in range(0, len(response_json), 10):
+                yield MockMessageChunk(response_json[i : i + 10])
+
+    def mock_init(self, *args, **kwargs):
+        self.qa_type = OpenEndedQuestionBank
+        self.n_questions = 5
+        self.chain = MockLLM()
+        self.output_type = OutputType.JSON
+
+    monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
+
+    generator = QuestionGenerator()
+    deltas = list(generator.stream(sample_context))
+
+    assert len(deltas) > 1
+    assert json.loads("".join(deltas)) == sample_qa_response.model_dump()
+
+
+def test_stream_uses_invoke_when_cache_enabled(
+    monkeypatch, sample_context, sample_qa_response
+):
+    class MockMessage:
+        content = json.dumps(sample_qa_response.model_dump())
+
+    class MockLLM:
+        def invoke(self, _):
+            return MockMessage()
+
+        def stream(self, _):
+            raise AssertionError("stream bypasses the LLM cache")
+
+    def mock_init(self, *args, **kwargs):
+        self.qa_type = OpenEndedQuestionBank
+        self.n_questions = 5
+        self.chain = MockLLM()
+        self.output_type = OutputType.JSON
+
+    monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
+
+    generator = QuestionGenerator()
+    try:
+        enable_llm_cache()
+        deltas = list(generator.stream(sample_context))
+    finally:
+        set_llm_cache(None)
+
+    assert deltas == [MockMessage.content]
+
+
 def test_batch_invoke_json(monkeypatch, sample_context, sample_qa_response):
     """Test batch invoking the generator with JSON output format."""
     # Use model_dump to get JSON representation
@@ -194,8 +256,7 @@ def test_batch_invoke_json(monkeypatch, sample_context, sample_qa_response):
     def mock_init(self, *args, **kwargs):
         self.qa_type = OpenEndedQuestionBank
         self.n_questions = 5
-        self.human, self.system, self.template_format = "", "", ""
-        self.llm = MockLLM()
+        self.chain = MockLLM()
         self.output_type = OutputType.JSON
 
     monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
@@ -209,3 +270,112 @@ def test_batch_invoke_json(monkeypatch, sample_context, sample_qa_response):
     assert len(results) == 2
     assert all(isinstance(result, dict) for result in results)
     assert all("open_ended_questions" in result for result in results)
+
+
+def test_abatch_invoke(monkeypatch, sample_context, sample_qa_response):
+    """Test that async batch invoking respects the concurrency limit and order."""
+    in_flight = 0
+    max_in_flight = 0
+
+    class MockStructuredLLM:
+        async def ainvoke(self, messages):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return messages
+
+    def mock_init(self, *args, **kwargs):
+        self.qa_type = OpenEndedQuestionBank
+        self.n_questions = 5
+        self.chain = MockStructuredLLM()
+        self.output_type = OutputType.DATACLASS
+
+    monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
+
+    generator = QuestionGenerator()
+    contexts = [f"{sample_context} {i}" for i in range(6)]
+    results = asyncio.run(generator.abatch_invoke(contexts, max_concurrency=2))
+
+    assert max_in_flight == 2
+    assert [inputs["CONTEXT"] for inputs in results] == contexts
+
+
+def test_batch_invoke_from_files_resumes_from_checkpoint(
+    monkeypatch, tmp_path, sample_qa_response
+):
+    """Test that a checkpointed batch skips files already recorded in the JSONL."""
+    file_paths = []
+    for name in ["a", "b", "c"]:
+        file_path = tmp_path / f"{name}.txt"
+        file_path.write_text(f"Context {name}")
+        file_paths.append(str(file_path))
+    output_jsonl = tmp_path / "checkpoint.jsonl"
+    calls = []
+
+    class FailingLLM:
+        def batch_as_completed(self, inputs):
+            calls.append(len(inputs))
+            yield 1, sample_qa_response
+            raise RuntimeError("connection lost")
+
+    class MockLLM:
+        def batch_as_completed(self, inputs):
+            calls.append(len(inputs))
+            for i, _ in enumerate(inputs):
+                yield i, sample_qa_response
+
+    def mock_init(self, *args, **kwargs):
+        self.qa_type = OpenEndedQuestionBank
+        self.n_questions = 5
+        self.chain = kwargs["llm"]
+        self.output_type = OutputType.DATACLASS
+
+    monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
+
+    generator = QuestionGenerator(llm=FailingLLM())
+    with pytest.raises(RuntimeError):
+        generator.batch_invoke_from_files(file_paths, output_jsonl=str(output_jsonl))
+    records = [json.loads(line) for line in output_jsonl.read_text().splitlines()]
+    assert [record["file"] for record in records] == [file_paths[1]]
+
+    generator = QuestionGenerator(llm=MockLLM())
+    results = generator.batch_invoke_from_files(
+        file_paths, output_jsonl=str(output_jsonl)
+    )
+
+    assert calls == [3, 2]
+    assert len(results) == 3
+    assert all(result == sample_qa_response for result in results)
+    assert len(output_jsonl.read_text().splitlines()) == 3
+
+
+def test_save_result_dataclass(monkeypatch, tmp_path, sample_mcq_response):
+    def mock_init(self, *args, **kwargs):
+        self.output_type = OutputType.DATACLASS
+
+    monkeypatch.setattr(QuestionGenerator, "__init__", mock_init)
+
+    generator = QuestionGenerator()
+    output_path = tmp_path / "out" / "qa.json"
+    generator.save_result(sample_mcq_response, str(output_path))
+
+    saved = json.loads(output_path.read_text(encoding="utf-8"))
+    assert saved == sample_mcq_response.model_dump()
+
+
+def test_enable_llm_cache():
+    """Test that enabling the cache installs a global LangChain LLM cache."""
+    try:
+        enable_llm_cache()
+        assert isinstance(get_llm_cache(), InMemoryCache)
+    finally:
+        set_llm_cache(None)
+
+
+def test_enable_llm_cache_sqlite_without_langchain_community(monkeypatch, tmp_path):
+    """Test that a missing optional dependency is reported with an install hint."""
+    monkeypatch.setitem(sys.modules, "langchain_community.cache", None)
+    with pytest.raises(ImportError, match=r"qageneratorllm\[cache\]"):
+        enable_llm_cache(str(tmp_path / "cache.db"))
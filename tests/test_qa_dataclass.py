@@ -29,6 +29,18 @@ def test_multiple_choice_question():
     assert question.correct_option_ids == ["A"]
 
 
+def test_option_ids_are_interned():
+    # Build equal ids at runtime so they start out as distinct string objects
+    option_id, correct_id = "".join(["A", "1"]), "".join(["A", "1"])
+    question = MultipleChoiceQuestion(
+        question_text="Q?",
+        answer_options=[MultipleChoiceOption(option_id=option_id, option_text="A")],
+        correct_option_ids=[correct_id],
+        answer_explanation="E",
+    )
+    assert question.answer_options[0].option_id is question.correct_option_ids[0]
+
+
 def test_open_ended_question():
     qa = OpenEndedQuestion(
         question_prompt="Test question?", reference_answer="Test answer"